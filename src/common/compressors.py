@@ -0,0 +1,136 @@
+import argparse
+import threading
+from functools import lru_cache
+from importlib.metadata import entry_points
+
+ENTRY_POINT_GROUP = "project.compressors"
+
+# Built-in codecs, imported on first use
+
+def parse_level(name, value, low, high):
+    value = int(value)
+    if not low <= value <= high:
+        raise ValueError(f"{name} must be between {low} and {high}, got {value}")
+    return value
+
+def gzip_factory(level="9"):
+    import gzip
+    level = parse_level("level", level, 0, 9)
+    return lambda data: gzip.compress(data, compresslevel=level)
+
+def bz2_factory(level="9"):
+    import bz2
+    level = parse_level("level", level, 1, 9)
+    return lambda data: bz2.compress(data, compresslevel=level)
+
+def lzma_factory(preset="6"):
+    import lzma
+    extreme = preset.endswith("e")
+    preset = parse_level("preset", preset.rstrip("e"), 0, 9) | (lzma.PRESET_EXTREME if extreme else 0)
+    return lambda data: lzma.compress(data, preset=preset)
+
+def zstd_factory(level="3", long=None):
+    import zstandard
+    level = parse_level("level", level, -(2**17), zstandard.MAX_COMPRESSION_LEVEL)
+    if long is None:
+        options = {"level": level}
+    else:
+        window_log = parse_level("long", long, zstandard.WINDOWLOG_MIN, zstandard.WINDOWLOG_MAX)
+        options = {"compression_params": zstandard.ZstdCompressionParameters.from_level(level, window_log=window_log, enable_ldm=True)}
+
+    # A ZstdCompressor must not be used by two threads at once, so every thread gets its own
+    local = threading.local()
+    local.compressor = zstandard.ZstdCompressor(**options)
+
+    def compress(data):
+        if not hasattr(local, "compressor"):
+            local.compressor = zstandard.ZstdCompressor(**options)
+        return local.compressor.compress(data)
+
+    return compress
+
+def zlib_factory(level="-1"):
+    import zlib
+    level = parse_level("level", level, -1, 9)
+    return lambda data: zlib.compress(data, level)
+
+def lz4_factory(level="0"):
+    import lz4.frame
+    level = parse_level("level", level, -(2**16), lz4.frame.COMPRESSIONLEVEL_MAX)
+    return lambda data: lz4.frame.compress(data, compression_level=level)
+
+def snappy_factory():
+    import snappy
+    return snappy.compress
+
+# Registry
+
+registry = {}
+
+def register_compressor(name, factory, max_window=None, dictionary=False, releases_gil=False):
+    registry[name] = {
+        "factory": factory,
+        "max_window": max_window,
+        "dictionary": dictionary,
+        "releases_gil": releases_gil,
+    }
+
+register_compressor("gzip", gzip_factory, max_window=2**15, releases_gil=True)
+register_compressor("bz2", bz2_factory, max_window=900 * 1000, releases_gil=True)
+register_compressor("lzma", lzma_factory, max_window=1536 * 2**20, releases_gil=True)
+register_compressor("zstd", zstd_factory, max_window=2**31, dictionary=True, releases_gil=True)
+register_compressor("zlib", zlib_factory, max_window=2**15, dictionary=True, releases_gil=True)
+register_compressor("lz4", lz4_factory, max_window=2**16, releases_gil=True)
+register_compressor("snappy", snappy_factory, max_window=2**16)
+
+@lru_cache(maxsize=None)
+def discover_plugins():
+    # Plugins are loaded lazily: only the entry point is recorded here
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        registry.setdefault(entry_point.name, entry_point)
+
+def get_compressor_info(name):
+    discover_plugins()
+    info = registry.get(name)
+
+    if info is None:
+        raise ValueError(f"Invalid compression algorithm: {name}")
+
+    if not isinstance(info, dict):
+        # A plugin entry point resolves to the same mapping as register_compressor builds
+        info = registry[name] = {"max_window": None, "dictionary": False, "releases_gil": False, **info.load()}
+
+    return info
+
+def available_compressors():
+    discover_plugins()
+    return list(registry.keys())
+
+def parse_spec(spec):
+    name, _, params = spec.partition(":")
+    params = dict(param.split("=", 1) if "=" in param else (param, "") for param in params.split(",") if param)
+    return name, params
+
+@lru_cache(maxsize=None)
+def get_compressor(spec):
+    name, params = parse_spec(spec)
+    factory = get_compressor_info(name)["factory"]
+
+    try:
+        return factory(**params)
+    except (TypeError, ValueError) as error:
+        raise ValueError(f"Invalid parameters for compression algorithm {name}: {error}")
+
+def compressor_spec(spec):
+    try:
+        # Compress once so codec errors show up here and not in the workers
+        get_compressor(spec)(b"")
+    except Exception as error:
+        raise argparse.ArgumentTypeError(f"{spec}: {error}")
+    return spec
+
+def compress_file(algorithm, data):
+    return get_compressor(algorithm)(data)
+
+def compress_files(algorithm, x, y):
+    return compress_file(algorithm, x + y)
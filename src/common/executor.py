@@ -0,0 +1,48 @@
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool, Manager, cpu_count
+
+EXECUTOR_MODES = ["process", "thread", "hybrid"]
+
+def run_threads(func, tasks, threads):
+    if threads <= 1:
+        return [func(*task) for task in tasks]
+
+    with ThreadPoolExecutor(threads) as executor:
+        return list(executor.map(lambda task: func(*task), tasks))
+
+def starmap(func, tasks, mode="process", workers=None, threads=4, chunk_size=1):
+    workers = workers or cpu_count()
+    tasks = list(tasks)
+
+    match mode:
+        case "thread":
+            return run_threads(func, tasks, workers)
+        case "process":
+            with Pool(workers) as pool:
+                return pool.starmap(func, tasks, chunksize=chunk_size)
+        case "hybrid":
+            # Every process runs its chunk of tasks on its own thread pool
+            chunk_size = max(chunk_size, threads)
+            chunks = [(func, tasks[i:i + chunk_size], threads) for i in range(0, len(tasks), chunk_size)]
+            with Pool(workers) as pool:
+                return [result for results in pool.starmap(run_threads, chunks, chunksize=1) for result in results]
+        case _:
+            raise ValueError(f"Invalid executor mode: {mode}")
+
+def get_manager(mode):
+    # Threads share the process memory, processes need a proxy to see each other's writes
+    return nullcontext() if mode == "thread" else Manager()
+
+def shared_dict(manager, data=None):
+    return manager.dict(data or {}) if manager else dict(data or {})
+
+def add_executor_arguments(parser, default="process", include_executor=True):
+    if include_executor:
+        parser.add_argument("--executor", type=str, default=default, choices=EXECUTOR_MODES, help=f"Run tasks on processes, threads, or processes running threads (default: {default})")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes or threads (default: number of CPUs)")
+    parser.add_argument("--threads", type=int, default=4, help="Number of threads per process in hybrid mode (default: 4)")
+    parser.add_argument("--chunk-size", type=int, default=1, help="Number of tasks sent to a worker process at once (default: 1)")
+
+def executor_options(args):
+    return {"mode": args.executor, "workers": args.workers, "threads": args.threads, "chunk_size": args.chunk_size}
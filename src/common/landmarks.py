@@ -0,0 +1,107 @@
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from common.utils import split_frames
+
+# Landmark extraction
+
+def hash_landmark(anchor, target, delta):
+    return (anchor << 16) | (target << 8) | delta
+
+def extract_landmarks(peaks, n_freqs, fan_out=5, max_delta=32):
+    if not 0 < max_delta < 256:
+        raise ValueError(f"Invalid maximum time delta: {max_delta}")
+
+    frames = split_frames(peaks, n_freqs)
+    landmarks = array("I")
+
+    for time, frame in enumerate(frames):
+        # Peaks are deduplicated in GetMaxFreqs order so the strongest ones are paired first
+        for anchor in dict.fromkeys(frame):
+            pairs = 0
+            for delta in range(1, min(max_delta, len(frames) - time - 1) + 1):
+                for target in dict.fromkeys(frames[time + delta]):
+                    landmarks.extend((hash_landmark(anchor, target, delta), time))
+                    pairs += 1
+                    if pairs >= fan_out:
+                        break
+                if pairs >= fan_out:
+                    break
+
+    return landmarks
+
+def write_landmarks(path, landmarks):
+    with open(path, "wb") as file:
+        landmarks.tofile(file)
+
+def read_landmarks(path):
+    landmarks = array("I")
+    with open(path, "rb") as file:
+        landmarks.frombytes(file.read())
+    return landmarks
+
+# Inverted index
+
+def build_index(landmark_paths):
+    names = sorted(os.path.basename(path) for path in landmark_paths)
+    paths = {os.path.basename(path): path for path in landmark_paths}
+    entries = []
+
+    for song_id, name in enumerate(names):
+        landmarks = read_landmarks(paths[name])
+        entries.extend((landmarks[i], song_id, landmarks[i + 1]) for i in range(0, len(landmarks), 2))
+
+    entries.sort()
+
+    hashes, offsets, songs, times = array("I"), array("I"), array("I"), array("I")
+    for i, (landmark_hash, song_id, time) in enumerate(entries):
+        if not hashes or hashes[-1] != landmark_hash:
+            hashes.append(landmark_hash)
+            offsets.append(i)
+        songs.append(song_id)
+        times.append(time)
+    offsets.append(len(entries))
+
+    return {"names": names, "hashes": hashes, "offsets": offsets, "songs": songs, "times": times}
+
+def save_index(index, path):
+    names = "\n".join(index["names"]).encode()
+    with open(path, "wb") as file:
+        file.write(struct.pack("<4Q", len(names), len(index["hashes"]), len(index["offsets"]), len(index["songs"])))
+        file.write(names)
+        for key in ("hashes", "offsets", "songs", "times"):
+            index[key].tofile(file)
+
+def load_index(path):
+    with open(path, "rb") as file:
+        names_size, n_hashes, n_offsets, n_entries = struct.unpack("<4Q", file.read(32))
+        names = file.read(names_size).decode().split("\n") if names_size else []
+        index = {"names": names}
+        for key, size in (("hashes", n_hashes), ("offsets", n_offsets), ("songs", n_entries), ("times", n_entries)):
+            index[key] = array("I")
+            index[key].fromfile(file, size)
+    return index
+
+# Identification
+
+def lookup(index, landmark_hash):
+    i = bisect_left(index["hashes"], landmark_hash)
+    if i == len(index["hashes"]) or index["hashes"][i] != landmark_hash:
+        return range(0)
+    return range(index["offsets"][i], index["offsets"][i + 1])
+
+def identify(index, landmarks):
+    histogram = Counter()
+
+    for i in range(0, len(landmarks), 2):
+        landmark_hash, query_time = landmarks[i], landmarks[i + 1]
+        for entry in lookup(index, landmark_hash):
+            histogram[index["songs"][entry], index["times"][entry] - query_time] += 1
+
+    scores = {}
+    for (song_id, _), votes in histogram.items():
+        scores[song_id] = max(scores.get(song_id, 0), votes)
+
+    return sorted(((index["names"][song_id], votes) for song_id, votes in scores.items()), key=lambda x: -x[1])
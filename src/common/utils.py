@@ -1,36 +1,50 @@
 import os
 import subprocess
 import csv
-import gzip
-import bz2
-import lzma
-import zstandard as zstd
-import zlib
-import lz4.frame as lz4
-import snappy
-
-# Compression utilities
-
-compressors = {
-    "gzip": gzip.compress,
-    "bz2": bz2.compress,
-    "lzma": lzma.compress,
-    "zstd": zstd.ZstdCompressor().compress,
-    "zlib": zlib.compress,
-    "lz4": lz4.compress,
-    "snappy": snappy.compress,
+from common.compressors import compress_file, compress_files, available_compressors, compressor_spec
+
+# Signature utilities
+
+def split_frames(data, n_freqs):
+    return [data[i:i + n_freqs] for i in range(0, len(data) - n_freqs + 1, n_freqs)]
+
+def encode_sorted_frame(frame):
+    return bytes(sorted(frame))
+
+def encode_delta_frame(frame):
+    bins = sorted(frame)
+    return bytes([bins[0]] + [b - a for a, b in zip(bins, bins[1:])])
+
+def encode_bitmap_frame(frame):
+    bitmap = 0
+    for peak in frame:
+        bitmap |= 1 << peak
+    return bitmap.to_bytes(32, "little")
+
+signature_encoders = {
+    "raw": bytes,
+    "sorted": encode_sorted_frame,
+    "delta": encode_delta_frame,
+    "bitmap": encode_bitmap_frame,
 }
 
-def compress_file(algorithm, data):
-    compressor = compressors.get(algorithm)
+def encode_signature(data, n_freqs, encoding="raw", stride=1):
+    encoder = signature_encoders.get(encoding)
 
-    if not compressor:
-        raise ValueError(f"Invalid compression algorithm: {algorithm}")
-    
-    return compressor(data)
+    if not encoder:
+        raise ValueError(f"Invalid signature encoding: {encoding}")
+
+    if n_freqs < 1 or stride < 1:
+        raise ValueError(f"Invalid number of frequencies or stride: {n_freqs}, {stride}")
+
+    frames = split_frames(data, n_freqs)[::stride]
+    return b"".join(encoder(frame) for frame in frames)
 
-def compress_files(algorithm, x, y):
-    return compress_file(algorithm, x + y)
+def get_number_of_frequencies(signature_args, default=4):
+    signature_args = signature_args.split()
+    if "-nf" in signature_args:
+        return int(signature_args[signature_args.index("-nf") + 1])
+    return default
 
 # File utilities
 
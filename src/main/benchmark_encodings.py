@@ -0,0 +1,106 @@
+import os
+import argparse
+import csv
+import time
+from itertools import product
+from common.utils import load_audio_files, compress_file, compress_files, encode_signature, signature_encoders, available_compressors, compressor_spec
+from common.executor import starmap, add_executor_arguments, executor_options
+from main.create_distance_results import NCD, read_file
+
+def encode_signatures(paths, n_freqs, encoding, stride):
+    return {os.path.basename(path): encode_signature(read_file(path), n_freqs, encoding, stride) for path in paths}
+
+def calculate_ncd(algorithm, x, y, C_x, C_y):
+    return NCD(C_x, C_y, len(compress_files(algorithm, x, y)))
+
+def benchmark_encoding(segment_signature_paths, signature_paths, algorithm, n_freqs, encoding, stride, executor_args=None):
+    # 1. Encode every signature in memory
+    segments = encode_signatures(segment_signature_paths, n_freqs, encoding, stride)
+    signatures = encode_signatures(signature_paths, n_freqs, encoding, stride)
+
+    start = time.time()
+
+    # 2. Compress every signature on its own
+    segment_sizes = {name: len(compress_file(algorithm, data)) for name, data in segments.items()}
+    signature_sizes = {name: len(compress_file(algorithm, data)) for name, data in signatures.items()}
+
+    # 3. Compute the NCD of every segment and signature pair
+    pairs = list(product(segments, signatures))
+    tasks = [
+        (algorithm, segments[segment_name], signatures[signature_name], segment_sizes[segment_name], signature_sizes[signature_name])
+        for segment_name, signature_name in pairs
+    ]
+
+    distances = starmap(calculate_ncd, tasks, **(executor_args or {}))
+
+    elapsed = time.time() - start
+
+    # 4. Find the closest signature for every segment
+    best = {}
+    for (segment_name, signature_name), distance in zip(pairs, distances):
+        if segment_name not in best or distance < best[segment_name][1]:
+            best[segment_name] = (signature_name, distance)
+
+    correct = sum(
+        segment_name.rsplit('_', 2)[0] == signature_name.rsplit('.', 1)[0]
+        for segment_name, (signature_name, _) in best.items()
+    )
+
+    size = sum(map(len, segments.values())) + sum(map(len, signatures.values()))
+
+    return {
+        "encoding": encoding,
+        "stride": stride,
+        "signature_bytes": size,
+        "seconds": elapsed,
+        "pairs_per_second": len(pairs) / elapsed if elapsed > 0 else 0,
+        "accuracy": correct / len(best) if best else 0,
+    }
+
+def benchmark_encodings(segment_signature_paths, signature_paths, algorithm, n_freqs, encodings, strides, output_path=None, executor_args=None):
+    results = []
+
+    for encoding, stride in product(encodings, strides):
+        result = benchmark_encoding(segment_signature_paths, signature_paths, algorithm, n_freqs, encoding, stride, executor_args)
+        results.append(result)
+        print(
+            f"{encoding} (stride {stride}): {result['signature_bytes']} bytes, "
+            f"{result['seconds']:.2f} seconds, {result['pairs_per_second']:.1f} pairs/s, "
+            f"accuracy {result['accuracy']:.3f}"
+        )
+
+    if output_path:
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, "w", newline='') as result_file:
+            csv_writer = csv.DictWriter(result_file, fieldnames=list(results[0].keys()))
+            csv_writer.writeheader()
+            csv_writer.writerows(results)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the size, throughput and accuracy of signature encodings.")
+    parser.add_argument("paths", nargs="+", type=str, help="Path to raw segment signatures or directories containing them")
+    parser.add_argument("-d", "--database-path", type=str, help="Path to the raw database signatures", default="data/signatures/")
+    parser.add_argument("-n", "--algorithm", type=compressor_spec, help=f"Algorithm to compress files, optionally with parameters such as zstd:level=19,long=27 (available: {', '.join(available_compressors())})", default=available_compressors()[0])
+    parser.add_argument("-e", "--encodings", nargs="+", type=str, help="Encodings to compare (default: all)", default=list(signature_encoders.keys()), choices=list(signature_encoders.keys()))
+    parser.add_argument("-s", "--strides", nargs="+", type=int, help="Strides to compare (default: 1)", default=[1])
+    parser.add_argument("-f", "--n-freqs", type=int, default=4, help="Number of frequencies per frame in the raw signatures (default: 4)")
+    parser.add_argument("-o", "--output-path", type=str, help="Path to store the benchmark results", default=None)
+    add_executor_arguments(parser)
+    args = parser.parse_args()
+
+    segment_signature_paths = load_audio_files(args.paths, extensions=(".freqs"))
+    signature_paths = load_audio_files([args.database_path], extensions=(".freqs"))
+
+    benchmark_encodings(
+        segment_signature_paths,
+        signature_paths,
+        args.algorithm,
+        args.n_freqs,
+        args.encodings,
+        args.strides,
+        args.output_path,
+        executor_options(args),
+    )
+
+if __name__ == '__main__':
+    main()
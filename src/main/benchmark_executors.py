@@ -0,0 +1,77 @@
+import os
+import argparse
+import csv
+import tempfile
+import time
+from common.utils import load_audio_files, available_compressors, compressor_spec
+from common.executor import EXECUTOR_MODES, add_executor_arguments
+from main.create_distance_results import create_results
+
+def benchmark_executor(segment_signature_paths, signature_paths, algorithm, mode, workers, threads, chunk_size, segment_block_size=64, signature_block_size=64):
+    executor_args = {"mode": mode, "workers": workers, "threads": threads, "chunk_size": chunk_size}
+
+    with tempfile.TemporaryDirectory() as temp_path:
+        start = time.time()
+        create_results(segment_signature_paths, signature_paths, algorithm, os.path.join(temp_path, "results.csv"), None, None, segment_block_size=segment_block_size, signature_block_size=signature_block_size, executor_args=executor_args)
+        elapsed = time.time() - start
+
+    n_pairs = len(segment_signature_paths) * len(signature_paths)
+    return {
+        "algorithm": algorithm,
+        "executor": mode,
+        "seconds": elapsed,
+        "pairs_per_second": n_pairs / elapsed if elapsed > 0 else 0,
+    }
+
+def benchmark_executors(segment_signature_paths, signature_paths, algorithms, modes, workers=None, threads=4, chunk_size=1, output_path=None, segment_block_size=64, signature_block_size=64):
+    results = []
+
+    for algorithm in algorithms:
+        algorithm_results = [
+            benchmark_executor(segment_signature_paths, signature_paths, algorithm, mode, workers, threads, chunk_size, segment_block_size, signature_block_size)
+            for mode in modes
+        ]
+        results.extend(algorithm_results)
+
+        for result in algorithm_results:
+            print(f"{algorithm} ({result['executor']}): {result['seconds']:.2f} seconds, {result['pairs_per_second']:.1f} pairs/s")
+        print(f"Fastest for {algorithm}: {max(algorithm_results, key=lambda x: x['pairs_per_second'])['executor']}")
+        print()
+
+    if output_path:
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, "w", newline='') as result_file:
+            csv_writer = csv.DictWriter(result_file, fieldnames=list(results[0].keys()))
+            csv_writer.writeheader()
+            csv_writer.writerows(results)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the executor modes of the distance computation for each compressor.")
+    parser.add_argument("paths", nargs="+", type=str, help="Path to segment signatures or directories containing them")
+    parser.add_argument("-d", "--database-path", type=str, help="Path to the database signatures", default="data/signatures/")
+    parser.add_argument("-n", "--algorithms", nargs="+", type=compressor_spec, help="Algorithms to compare (default: all)", default=available_compressors())
+    parser.add_argument("-e", "--executors", nargs="+", type=str, help="Executor modes to compare (default: all)", default=EXECUTOR_MODES, choices=EXECUTOR_MODES)
+    parser.add_argument("-s", "--segment-block-size", type=int, help="Number of segment signatures per work unit (default: 64)", default=64)
+    parser.add_argument("-b", "--signature-block-size", type=int, help="Number of database signatures per work unit (default: 64)", default=64)
+    parser.add_argument("-o", "--output-path", type=str, help="Path to store the benchmark results", default=None)
+    add_executor_arguments(parser, include_executor=False)
+    args = parser.parse_args()
+
+    segment_signature_paths = sorted(load_audio_files(args.paths, extensions=(".freqs")))
+    signature_paths = sorted(load_audio_files([args.database_path], extensions=(".freqs")))
+
+    benchmark_executors(
+        segment_signature_paths,
+        signature_paths,
+        args.algorithms,
+        args.executors,
+        args.workers,
+        args.threads,
+        args.chunk_size,
+        args.output_path,
+        args.segment_block_size,
+        args.signature_block_size,
+    )
+
+if __name__ == '__main__':
+    main()
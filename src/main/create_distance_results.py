@@ -1,9 +1,11 @@
 import os
 import argparse
 import csv
+import json
+from fnmatch import fnmatch
 from itertools import product
-from multiprocessing import Pool, Manager, cpu_count
-from common.utils import load_audio_files, compress_file, compress_files, compressors, timer
+from common.utils import load_audio_files, compress_file, compress_files, available_compressors, compressor_spec, timer
+from common.executor import starmap, get_manager, shared_dict, add_executor_arguments, executor_options
 
 def NCD(C_x, C_y, C_xy):
     num = C_xy - min(C_x, C_y)
@@ -28,12 +30,15 @@ def get_compressed_length(algorithm, data, cache, cache_key):
         cache[cache_key] = len(compress_file(algorithm, data))
     return cache[cache_key]
 
-def compress_and_calculate(segment_signature_path, signature, algorithm, segment_signatures_cache, signatures_cache):
+def read_signature(filepath, signatures=None):
+    return signatures[filepath] if signatures is not None else read_file(filepath)
+
+def compress_and_calculate(segment_signature_path, signature, algorithm, segment_signatures_cache, signatures_cache, signatures=None):
     segment_signature_name = os.path.basename(segment_signature_path)
     signature_name = os.path.basename(signature)
     
-    x = read_file(segment_signature_path)
-    y = read_file(signature)
+    x = read_signature(segment_signature_path, signatures)
+    y = read_signature(signature, signatures)
 
     C_x = get_compressed_length(algorithm, x, segment_signatures_cache, segment_signature_name)
     C_y = get_compressed_length(algorithm, y, signatures_cache, signature_name)
@@ -44,25 +49,116 @@ def compress_and_calculate(segment_signature_path, signature, algorithm, segment
 
     return segment_signature_name, signature_name, ncd
 
+def split_blocks(paths, block_size):
+    paths = sorted(paths)
+    return [paths[i:i + block_size] for i in range(0, len(paths), block_size)]
+
+def get_shard_path(checkpoint_path, unit):
+    return os.path.join(checkpoint_path, f"unit_{unit:06d}.csv")
+
+def write_csv_atomically(path, rows):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", newline='') as result_file:
+        csv_writer = csv.writer(result_file)
+        csv_writer.writerows(rows)
+        result_file.flush()
+        os.fsync(result_file.fileno())
+    os.replace(temp_path, path)
+
+def prepare_checkpoint(checkpoint_path, manifest, resume):
+    manifest_path = os.path.join(checkpoint_path, "manifest.json")
+
+    if resume and os.path.isfile(manifest_path):
+        with open(manifest_path, "r") as manifest_file:
+            if json.load(manifest_file) != manifest:
+                raise ValueError(f"Checkpoint at {checkpoint_path} belongs to a different job")
+        return
+
+    # Only clear files this job writes, never anything else in the directory
+    if os.path.isdir(checkpoint_path):
+        if os.listdir(checkpoint_path) and not os.path.isfile(manifest_path):
+            raise ValueError(f"Checkpoint path {checkpoint_path} is not empty and has no manifest.json")
+        for filename in os.listdir(checkpoint_path):
+            if filename == "manifest.json" or fnmatch(filename, "unit_*.csv") or filename.endswith(".tmp"):
+                os.remove(os.path.join(checkpoint_path, filename))
+    os.makedirs(checkpoint_path, exist_ok=True)
+
+    with open(f"{manifest_path}.tmp", "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+
+def split_waves(unit_ids, units, wave_size):
+    # Group units so every executor call has enough pairs to keep all workers busy
+    waves, wave, n_pairs = [], [], 0
+    for unit in unit_ids:
+        wave.append(unit)
+        n_pairs += len(units[unit][0]) * len(units[unit][1])
+        if n_pairs >= wave_size:
+            waves.append(wave)
+            wave, n_pairs = [], 0
+    if wave:
+        waves.append(wave)
+    return waves
+
+def merge_shards(checkpoint_path, n_units, output_path):
+    temp_path = f"{output_path}.tmp"
+    with open(temp_path, "w", newline='') as result_file:
+        csv_writer = csv.writer(result_file)
+        csv_writer.writerow(["segment_signature", "signature", "ncd"])
+        for unit in range(n_units):
+            with open(get_shard_path(checkpoint_path, unit), "r", newline='') as shard_file:
+                csv_writer.writerows(csv.reader(shard_file))
+    os.replace(temp_path, output_path)
+
 @timer
-def create_results(segment_signature_paths, signature_paths, algorithm, output_path, x_compression_results_path, y_compression_results_path):
+def create_results(segment_signature_paths, signature_paths, algorithm, output_path, x_compression_results_path, y_compression_results_path, checkpoint_path=None, segment_block_size=64, signature_block_size=64, resume=False, executor_args=None, wave_size=4096):
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    
-    with Manager() as manager:
-        segment_cache = manager.dict(read_compression_results(x_compression_results_path))
-        signature_cache = manager.dict(read_compression_results(y_compression_results_path))
-        tasks = [
-            (segment_path, signature_path, algorithm, segment_cache, signature_cache)
-            for segment_path, signature_path in product(segment_signature_paths, signature_paths)
-        ]
-        
-        with Pool(cpu_count()) as pool:
-            results = pool.starmap(compress_and_calculate, tasks)
-    
-        with open(output_path, "w", newline='') as result_file:
-            csv_writer = csv.writer(result_file)
-            csv_writer.writerow(["segment_signature", "signature", "ncd"])
-            csv_writer.writerows(results)
+
+    # 1. Split the job into deterministic work units
+    segment_blocks = split_blocks(segment_signature_paths, segment_block_size)
+    signature_blocks = split_blocks(signature_paths, signature_block_size)
+    units = list(product(segment_blocks, signature_blocks))
+
+    # 2. Create the checkpoint or check that it belongs to this job
+    checkpoint_path = checkpoint_path or f"{output_path}.parts"
+    manifest = {
+        "algorithm": algorithm,
+        "segment_blocks": segment_blocks,
+        "signature_blocks": signature_blocks,
+    }
+    prepare_checkpoint(checkpoint_path, manifest, resume)
+
+    # 3. Compute only the units without a committed shard
+    missing_units = [unit for unit in range(len(units)) if not os.path.isfile(get_shard_path(checkpoint_path, unit))]
+    print(f"Computing {len(missing_units)} of {len(units)} work units")
+
+    # 4. Threads share one copy of the signatures and caches, processes go through a manager
+    executor_args = executor_args or {}
+    mode = executor_args.get("mode", "process")
+    signatures = None
+    if mode == "thread":
+        signatures = {path: read_file(path) for path in set(segment_signature_paths) | set(signature_paths)}
+
+    with get_manager(mode) as manager:
+        segment_cache = shared_dict(manager, read_compression_results(x_compression_results_path))
+        signature_cache = shared_dict(manager, read_compression_results(y_compression_results_path))
+        # 5. Run the pairs of a wave of units in parallel, then commit each unit's shard
+        for wave in split_waves(missing_units, units, wave_size):
+            pairs = [(unit, pair) for unit in wave for pair in product(*units[unit])]
+            tasks = [
+                (segment_path, signature_path, algorithm, segment_cache, signature_cache, signatures)
+                for _, (segment_path, signature_path) in pairs
+            ]
+            results = starmap(compress_and_calculate, tasks, **executor_args)
+
+            shards = {unit: [] for unit in wave}
+            for (unit, _), result in zip(pairs, results):
+                shards[unit].append(result)
+            for unit, rows in shards.items():
+                write_csv_atomically(get_shard_path(checkpoint_path, unit), rows)
+
+    # 6. Merge the shards into the combined output
+    merge_shards(checkpoint_path, len(units), output_path)
 
 def main():
     parser = argparse.ArgumentParser(description="Find the most similar audio file in a database.")
@@ -70,10 +166,18 @@ def main():
     parser.add_argument("-x", "--x-compression-results-path", type=str, help="Path to store the compression results for the segment signatures", default=None)
     parser.add_argument("-y", "--y-compression-results-path", type=str, help="Path to store the compression results for the signatures", default=None)
     parser.add_argument("-d", "--database-path", type=str, help="Path to the database signatures", default="data/signatures/")
-    parser.add_argument("-n", "--algorithm", type=str, help="Algorithm to compress files", default=list(compressors.keys())[0], choices=list(compressors.keys()))
+    parser.add_argument("-n", "--algorithm", type=compressor_spec, help=f"Algorithm to compress files, optionally with parameters such as zstd:level=19,long=27 (available: {', '.join(available_compressors())})", default=available_compressors()[0])
     parser.add_argument("-o", "--output-path", type=str, help="Path to store the results", default="data/distances/{algorithm}/results.csv")
+    parser.add_argument("-c", "--checkpoint-path", type=str, help="Directory for the job manifest and finished work units (default: {output_path}.parts)", default=None)
+    parser.add_argument("-s", "--segment-block-size", type=int, help="Number of segment signatures per work unit (default: 64)", default=64)
+    parser.add_argument("-b", "--signature-block-size", type=int, help="Number of database signatures per work unit (default: 64)", default=64)
+    parser.add_argument("-r", "--resume", action="store_true", help="Only compute the work units missing from the checkpoint", default=False)
+    add_executor_arguments(parser)
     args = parser.parse_args()
 
+    if args.segment_block_size < 1 or args.signature_block_size < 1:
+        raise ValueError(f"Invalid block sizes: {args.segment_block_size}, {args.signature_block_size}")
+
     args.output_path = args.output_path.format(algorithm=args.algorithm)
 
     segment_signature_paths = load_audio_files(args.paths, extensions=(".freqs"))
@@ -86,6 +190,11 @@ def main():
         args.output_path, 
         args.x_compression_results_path, 
         args.y_compression_results_path,
+        args.checkpoint_path,
+        args.segment_block_size,
+        args.signature_block_size,
+        args.resume,
+        executor_options(args),
     )
 
 if __name__ == '__main__':
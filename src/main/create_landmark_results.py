@@ -0,0 +1,71 @@
+import os
+import argparse
+import csv
+import time
+from common.utils import load_audio_files, timer
+from common.landmarks import build_index, save_index, load_index, read_landmarks, identify
+
+def get_index(signature_paths, index_path=None):
+    if index_path and os.path.isfile(index_path):
+        index = load_index(index_path)
+        if index["names"] == sorted(os.path.basename(path) for path in signature_paths):
+            return index
+        print(f"Index at {index_path} does not match the database signatures, rebuilding it")
+
+    index = build_index(signature_paths)
+
+    if index_path:
+        os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+        save_index(index, index_path)
+
+    return index
+
+@timer
+def create_results(segment_signature_paths, signature_paths, output_path, index_path=None, k=None):
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    # 1. Build or load the inverted index of the database landmarks
+    index = get_index(signature_paths, index_path)
+
+    start = time.time()
+
+    with open(output_path, "w", newline='') as result_file:
+        csv_writer = csv.writer(result_file)
+        csv_writer.writerow(["segment_signature", "signature", "distance"])
+
+        for segment_signature_path in segment_signature_paths:
+            # 2. Vote for consistent time offsets of the matching landmarks
+            landmarks = read_landmarks(segment_signature_path)
+            matches = identify(index, landmarks)[:k]
+
+            # 3. Turn the votes into a distance so lower means more similar
+            n_landmarks = max(len(landmarks) // 2, 1)
+            segment_signature_name = os.path.basename(segment_signature_path)
+            csv_writer.writerows(
+                (segment_signature_name, signature_name, 1 - votes / n_landmarks)
+                for signature_name, votes in matches
+            )
+
+            # 4. Keep segments without any hit so they count as misses
+            if not matches:
+                csv_writer.writerow((segment_signature_name, "", 1.0))
+
+    elapsed = time.time() - start
+    print(f"Identified {len(segment_signature_paths)} segments against {len(index['names'])} signatures ({len(segment_signature_paths) / elapsed if elapsed > 0 else 0:.1f} queries/s)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Identify segments with the landmark inverted index.")
+    parser.add_argument("paths", nargs="+", type=str, help="Path to landmark files or directories containing the segment landmarks")
+    parser.add_argument("-d", "--database-path", type=str, help="Path to the database landmarks", default="data/signatures/landmark/")
+    parser.add_argument("-i", "--index-path", type=str, help="Path to load or store the inverted index of the database", default=None)
+    parser.add_argument("-k", "--k", type=int, help="Number of candidates to store per segment (default: all)", default=None)
+    parser.add_argument("-o", "--output-path", type=str, help="Path to store the results", default="data/distances/landmark/results.csv")
+    args = parser.parse_args()
+
+    segment_signature_paths = load_audio_files(args.paths, extensions=(".landmarks"))
+    signature_paths = load_audio_files([args.database_path], extensions=(".landmarks"))
+
+    create_results(segment_signature_paths, signature_paths, args.output_path, args.index_path, args.k)
+
+if __name__ == '__main__':
+    main()
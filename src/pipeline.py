@@ -1,10 +1,18 @@
+import os
+import queue
+import shutil
 import subprocess
+import tempfile
+import threading
+import time
 import argparse
 import yaml
+from common.utils import load_audio_files
 
-def run_script(script_name, args):
-    """Helper function to run a script with the provided arguments"""
-    # print current directory
+INPUT_KEY = '__NO_ARG_NAME__paths'
+STREAMABLE_SCRIPTS = {'create_segments.py', 'create_noise.py', 'create_signatures.py'}
+
+def build_command(script_name, args):
     command = ['python', script_name]
     for key, value in args.items():
         if value is None:
@@ -17,21 +25,247 @@ def run_script(script_name, args):
             command.extend([f"--{key.replace('_', '-')}", ' '.join(map(str, value))])
         elif value is not None:
             command.extend([f"--{key.replace('_', '-')}", str(value)])
+    return command
+
+def run_script(script_name, args):
+    """Helper function to run a script with the provided arguments"""
+    command = build_command(script_name, args)
     print(f"Running {' '.join(command)}")
     subprocess.run(command, check=True)
 
-def main(config_path):
+# Streaming execution
+
+def as_list(value):
+    return value if isinstance(value, list) else [value]
+
+def is_streamable(step):
+    args = step['args']
+    default = os.path.basename(step['script']) in STREAMABLE_SCRIPTS
+    if os.path.basename(step['script']) == 'create_noise.py' and args.get('noise_type') == 'video':
+        # Every batch would download the noise tracks again
+        default = False
+    return step.get('stream', default) and bool(args.get(INPUT_KEY)) and bool(args.get('output_path'))
+
+def resolve_output_path(args):
+    try:
+        return os.path.normpath(args['output_path'].format_map(args))
+    except KeyError as error:
+        raise ValueError(f"Streaming steps need an explicit value for {error} in output_path: {args['output_path']}")
+
+class Stage:
+    """A pipeline step that runs its script on batches of items taken from a bounded queue"""
+
+    def __init__(self, step, defaults):
+        self.script = step['script']
+        self.args = step['args']
+        self.output_path = resolve_output_path(self.args)
+        self.workers = step.get('workers', defaults.get('workers', 1))
+        self.batch_size = step.get('batch_size', defaults.get('batch_size', 8))
+        self.keep = step.get('keep', True)
+        # Each batch runs its own script, so its internal pool is capped too or workers would multiply
+        self.script_workers = step.get('script_workers', defaults.get('script_workers', 1))
+        self.queue = queue.Queue(maxsize=step.get('queue_size', defaults.get('queue_size', 32)))
+        self.sources = []
+        self.consumers = []
+        self.producers = 0
+        self.running_workers = 0
+        self.processed = 0
+        self.references = {}
+        self.lock = threading.Lock()
+
+    def put(self, item, failed):
+        # Blocks while the queue is full, which throttles the producers
+        while not failed.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def get_batch(self, failed):
+        while not failed.is_set():
+            try:
+                item = self.queue.get(timeout=0.1)
+                break
+            except queue.Empty:
+                continue
+        else:
+            return None
+
+        if item is None:
+            return None
+
+        batch = [item]
+        while len(batch) < self.batch_size:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Leave the end marker for the next worker
+                self.queue.put(item)
+                break
+            batch.append(item)
+        return batch
+
+    def producer_done(self, failed):
+        with self.lock:
+            self.producers -= 1
+            done = self.producers == 0
+        if done:
+            for _ in range(self.workers):
+                self.put(None, failed)
+
+    def release(self, path):
+        with self.lock:
+            self.references[path] -= 1
+            unused = self.references[path] == 0
+            if unused:
+                del self.references[path]
+        if unused and not self.keep:
+            os.remove(path)
+
+    def publish(self, path, start, latencies, failed):
+        if not self.consumers:
+            latencies.append(time.time() - start)
+            return
+        with self.lock:
+            self.references[path] = len(self.consumers)
+        for consumer in self.consumers:
+            consumer.put((path, start, self), failed)
+
+    def process(self, batch, latencies, failed):
+        # 1. Run the script on the batch with a private output directory
+        os.makedirs(self.output_path, exist_ok=True)
+        temp_path = tempfile.mkdtemp(prefix='.stream-', dir=self.output_path)
+        args = {**self.args, INPUT_KEY: [path for path, _, _ in batch], 'output_path': temp_path}
+        if os.path.basename(self.script) in STREAMABLE_SCRIPTS:
+            args.setdefault('workers', self.script_workers)
+        try:
+            subprocess.run(build_command(self.script, args), check=True)
+
+            # 2. Move the outputs into place and hand them to the next stages
+            for filename in sorted(os.listdir(temp_path)):
+                output_file = os.path.join(self.output_path, filename)
+                os.replace(os.path.join(temp_path, filename), output_file)
+                starts = [start for path, start, _ in batch if filename.startswith(os.path.basename(path).rsplit('.', 1)[0])]
+                self.publish(output_file, min(starts or [start for _, start, _ in batch]), latencies, failed)
+        finally:
+            shutil.rmtree(temp_path, ignore_errors=True)
+
+        # 3. Let the producing stages discard inputs nobody needs anymore
+        for path, _, producer in batch:
+            if producer is not None:
+                producer.release(path)
+
+        with self.lock:
+            self.processed += len(batch)
+
+    def work(self, latencies, failed, errors):
+        try:
+            while (batch := self.get_batch(failed)) is not None:
+                self.process(batch, latencies, failed)
+        except Exception as error:
+            errors.append(error)
+            failed.set()
+        finally:
+            with self.lock:
+                self.running_workers -= 1
+                last = self.running_workers == 0
+            if last and not failed.is_set():
+                for consumer in self.consumers:
+                    consumer.producer_done(failed)
+
+    def feed(self, failed, errors):
+        try:
+            for path in sorted(load_audio_files(self.sources)):
+                # Stamp every item as it enters the stream so latency excludes time spent waiting to be read
+                self.put((path, time.time(), None), failed)
+        except Exception as error:
+            errors.append(error)
+            failed.set()
+        finally:
+            if not failed.is_set():
+                self.producer_done(failed)
+
+def run_stream(stages):
+    if not stages:
+        return
+
+    print(f"Streaming {' -> '.join(os.path.basename(stage.script) for stage in stages)}")
+
+    latencies, errors = [], []
+    failed = threading.Event()
+    threads = []
+    start = time.time()
+
+    for stage in stages:
+        stage.running_workers = stage.workers
+        threads.extend(threading.Thread(target=stage.work, args=(latencies, failed, errors)) for _ in range(stage.workers))
+        if stage.sources:
+            threads.append(threading.Thread(target=stage.feed, args=(failed, errors)))
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+
+    makespan = time.time() - start
+    for stage in stages:
+        print(f"{stage.script}: {stage.processed} items with {stage.workers} workers")
+    if latencies:
+        print(f"Item latency: mean {sum(latencies) / len(latencies):.2f} s, max {max(latencies):.2f} s")
+    print(f"Makespan: {makespan:.2f} s")
+
+def run_streaming(steps, defaults):
+    stages, producers = [], {}
+
+    for step in steps:
+        if not is_streamable(step):
+            run_stream(stages)
+            stages, producers = [], {}
+            run_script(step['script'], step['args'])
+            continue
+
+        # Subscribe to the stages that produce this step's inputs, the rest are read from disk
+        stage = Stage(step, defaults)
+        for path in as_list(step['args'][INPUT_KEY]):
+            producer = producers.get(os.path.normpath(path))
+            if producer is not None:
+                producer.consumers.append(stage)
+                stage.producers += 1
+            else:
+                stage.sources.append(path)
+        if stage.sources:
+            stage.producers += 1
+
+        producers[stage.output_path] = stage
+        stages.append(stage)
+
+    run_stream(stages)
+
+def main(config_path, mode=None):
     with open(config_path, 'r') as file:
         config = yaml.safe_load(file)
-    
-    for step in config['steps']:
-        script = step['script']
-        args = step['args']
-        run_script(script, args)
+
+    match mode or config.get('mode', 'barrier'):
+        case 'barrier':
+            for step in config['steps']:
+                script = step['script']
+                args = step['args']
+                run_script(script, args)
+        case 'streaming':
+            run_streaming(config['steps'], config.get('streaming', {}))
+        case unknown:
+            raise ValueError(f"Invalid pipeline mode: {unknown}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Build an audio processing pipeline.")
     parser.add_argument("config", type=str, help="Path to the pipeline configuration file (YAML)")
+    parser.add_argument("-m", "--mode", type=str, choices=["barrier", "streaming"], default=None, help="Run steps one after another or stream items between them (default: mode from the configuration, else barrier)")
 
     args = parser.parse_args()
-    main(args.config)
+    main(args.config, args.mode)
@@ -0,0 +1,43 @@
+import os
+import argparse
+from common.utils import load_audio_files, encode_signature, signature_encoders, timer
+
+@timer
+def convert_signatures(signature_paths, output_path, n_freqs, encoding, stride, verbose=False):
+    # 1. Create the output directory if it does not exist
+    os.makedirs(output_path, exist_ok=True)
+
+    for signature_path in signature_paths:
+        # 2. Read the raw signature data
+        with open(signature_path, "rb") as signature_file:
+            data = signature_file.read()
+
+        # 3. Encode the signature data
+        encoded_data = encode_signature(data, n_freqs, encoding, stride)
+
+        # 4. Write the encoded signature to the output directory
+        output_file = os.path.join(output_path, os.path.basename(signature_path))
+        with open(output_file, "wb") as signature_file:
+            signature_file.write(encoded_data)
+
+        if verbose:
+            print(f"Converted {signature_path} from {len(data)} to {len(encoded_data)} bytes")
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert existing raw signatures to a different encoding.")
+    parser.add_argument("paths", nargs="+", type=str, help="Path to signatures or directories containing raw signatures")
+    parser.add_argument("-o", "--output-path", type=str, default="data/signatures/{encoding}", help="Output path for converted signatures (default: data/signatures/{encoding})")
+    parser.add_argument("-e", "--encoding", type=str, default="sorted", help="Encoding of the signature frames (default: sorted)", choices=list(signature_encoders.keys()))
+    parser.add_argument("-s", "--stride", type=int, default=1, help="Keep only every stride-th frame of the signature (default: 1)")
+    parser.add_argument("-f", "--n-freqs", type=int, default=4, help="Number of frequencies per frame in the raw signatures (default: 4)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print verbose output", default=False)
+    args = parser.parse_args()
+
+    args.output_path = args.output_path.format(encoding=args.encoding)
+
+    signature_paths = load_audio_files(args.paths, extensions=(".freqs"))
+
+    convert_signatures(signature_paths, args.output_path, args.n_freqs, args.encoding, args.stride, args.verbose)
+
+if __name__ == "__main__":
+    main()
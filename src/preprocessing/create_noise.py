@@ -4,69 +4,106 @@ import subprocess
 import tempfile
 import numpy as np
 from common.utils import load_audio_files, is_package_installed, timer
+from common.executor import starmap, add_executor_arguments, executor_options
 
-def add_sox_noise(audio_paths, noise_type, intensity, output_path, verbose):
+def add_sox_noise_file(audio_path, noise_effect, intensity, output_path, verbose):
+    filename = os.path.basename(audio_path)
+    output_file = os.path.join(output_path, filename)
+
+    # 4. Get the audio format of the audio file
+    audio_format = audio_path.rsplit('.', 1)[1]
+
+    # 5. Create temporary noise file
+    temp_noise_file_path = tempfile.mktemp(suffix=f'.{audio_format}')
+    
+    # 6. Find the duration of the audio file
+    duration = float(subprocess.check_output(
+        ["soxi", "-D", audio_path]
+    ).strip())
+
+    # 7. Find the sample rate of the audio file
+    sample_rate = int(subprocess.check_output(
+        ["soxi", "-r", audio_path]
+    ).strip())
+
+    # 8. Find the number of channels of the audio file
+    channels = int(subprocess.check_output(
+        ["soxi", "-c", audio_path]
+    ).strip())
+
+    # 9. Add noise to the audio file
+    subprocess.run(
+        ["sox", "-n", "-r", str(sample_rate), "-c", str(channels), temp_noise_file_path, "synth", str(duration), noise_effect, "vol", str(intensity)],
+        check=True
+    )
+
+    # 10. Mix the audio file with the noise
+    subprocess.run(
+        ["sox", "-m", audio_path, temp_noise_file_path, output_file],
+        check=True
+    )
+
+    # 11. Remove the temporary noise file
+    os.remove(temp_noise_file_path)
+
+    if verbose:
+        print(f"Added noise to {audio_path}")
+
+def add_sox_noise(audio_paths, noise_type, intensity, output_path, verbose, executor_args=None):
     # 3. Check if SoX is installed
     if not is_package_installed("sox"):
         print("SoX is not installed")
         return
 
-    for audio_path in audio_paths:
-        filename = os.path.basename(audio_path)
-        output_file = os.path.join(output_path, filename)
+    # Select the noise effect based on the noise type
+    match noise_type:
+        case "white":
+            noise_effect = "whitenoise"
+        case "pink":
+            noise_effect = "pinknoise"
+        case "brown" | "red":
+            noise_effect = "brownnoise"
+        case _:
+            print(f"Unknown noise type: {noise_type}")
+            return
 
-        # 4. Get the audio format of the audio file
-        audio_format = audio_path.rsplit('.', 1)[1]
+    tasks = [(audio_path, noise_effect, intensity, output_path, verbose) for audio_path in audio_paths]
+    starmap(add_sox_noise_file, tasks, **(executor_args or {}))
 
-        # 5. Create temporary noise file
-        temp_noise_file_path = tempfile.mktemp(suffix=f'.{audio_format}')
-        
-        # 6. Find the duration of the audio file
-        duration = float(subprocess.check_output(
-            ["soxi", "-D", audio_path]
-        ).strip())
+def add_video_noise_file(audio_path, temp_audio_path, overlay_noise_duration, position, audio_format, intensity, output_path, verbose):
+    filename = os.path.basename(audio_path)
+    output_file = os.path.join(output_path, filename)
 
-        # 7. Find the sample rate of the audio file
-        sample_rate = int(subprocess.check_output(
-            ["soxi", "-r", audio_path]
-        ).strip())
+    # 13. Get the duration of the audio file
+    noise_duration = float(subprocess.check_output(
+        ["soxi", "-D", audio_path]
+    ).strip())
 
-        # 8. Find the number of channels of the audio file
-        channels = int(subprocess.check_output(
-            ["soxi", "-c", audio_path]
-        ).strip())
+    noise_start = position * (overlay_noise_duration - noise_duration)
 
-        # 9. Select the noise effect based on the noise type
-        match noise_type:
-            case "white":
-                noise_effect = "whitenoise"
-            case "pink":
-                noise_effect = "pinknoise"
-            case "brown", "red":
-                noise_effect = "brownnoise"
-            case _:
-                print(f"Unknown noise type: {noise_type}")
-                return
-
-        # 9. Add noise to the audio file
-        subprocess.run(
-            ["sox", "-n", "-r", str(sample_rate), "-c", str(channels), temp_noise_file_path, "synth", str(duration), noise_effect, "vol", str(intensity)],
-            check=True
-        )
+    # 14. Create temporary trimmed audio file
+    trimmed_audio_path = tempfile.mktemp(suffix=f'.{audio_format}')
 
-        # 10. Mix the audio file with the noise
-        subprocess.run(
-            ["sox", "-m", audio_path, temp_noise_file_path, output_file],
-            check=True
-        )
+    # 15. Trim the overlay noise
+    subprocess.run(
+        ["sox", temp_audio_path, trimmed_audio_path, "trim", str(noise_start), str(noise_duration)],
+        check=True
+    )
+
+    # 16. Mix the audio file with the overlay noise
+    subprocess.run(
+        ["sox", "-m", "-v", "1", audio_path, "-v", str(intensity), trimmed_audio_path, output_file],
+        check=True,
+        stderr=subprocess.DEVNULL
+    )
 
-        # 11. Remove the temporary noise file
-        os.remove(temp_noise_file_path)
+    # 17. Remove the temporary trimmed audio file
+    os.remove(trimmed_audio_path)
 
-        if verbose:
-            print(f"Added noise to {audio_path}")
+    if verbose:
+        print(f"Added noise to {audio_path}")
 
-def add_video_noise(audio_paths, intensity, ids, output_path, verbose):
+def add_video_noise(audio_paths, intensity, ids, output_path, verbose, executor_args=None):
     # 3. Check if yt-dlp is installed
     if not is_package_installed("yt-dlp"):
         print("yt-dlp is not installed")
@@ -124,54 +161,28 @@ def add_video_noise(audio_paths, intensity, ids, output_path, verbose):
             ["soxi", "-D", temp_audio_path]
         ).strip())
 
-        for audio_path in audio_paths:
-            filename = os.path.basename(audio_path)
-            output_file = os.path.join(output_path, filename)
-
-            # 13. Get the duration of the audio file
-            noise_duration = float(subprocess.check_output(
-                ["soxi", "-D", audio_path]
-            ).strip())
-
-            noise_start = np.random.uniform(0, overlay_noise_duration - noise_duration)
-
-            # 14. Create temporary trimmed audio file
-            trimmed_audio_path = tempfile.mktemp(suffix=f'.{audio_format}')
-
-            # 15. Trim the overlay noise
-            subprocess.run(
-                ["sox", temp_audio_path, trimmed_audio_path, "trim", str(noise_start), str(noise_duration)],
-                check=True
-            )
-
-            # 16. Mix the audio file with the overlay noise
-            subprocess.run(
-                ["sox", "-m", "-v", "1", audio_path, "-v", str(intensity), trimmed_audio_path, output_file],
-                check=True,
-                stderr=subprocess.DEVNULL
-            )
-
-            # 17. Remove the temporary trimmed audio file
-            os.remove(trimmed_audio_path)
-
-            if verbose:
-                print(f"Added noise to {audio_path}")
+        # Random positions are drawn here so worker processes do not share one random state
+        tasks = [
+            (audio_path, temp_audio_path, overlay_noise_duration, np.random.random(), audio_format, intensity, output_path, verbose)
+            for audio_path in audio_paths
+        ]
+        starmap(add_video_noise_file, tasks, **(executor_args or {}))
 
         # 18. Remove the temporary audio file
         os.remove(temp_audio_path)
 
 
 @timer
-def add_noise(audio_paths, output_path, noise_type, intensity, ids, verbose):
+def add_noise(audio_paths, output_path, noise_type, intensity, ids, verbose, executor_args=None):
     # 1. Check if the output path exists and create it if it does not
     os.makedirs(output_path, exist_ok=True)
 
     # 2. Select the noise type and add noise to the audio files
     match noise_type:
         case "video":
-            add_video_noise(audio_paths, intensity, ids, output_path, verbose)
+            add_video_noise(audio_paths, intensity, ids, output_path, verbose, executor_args)
         case _:
-            add_sox_noise(audio_paths, noise_type, intensity, output_path, verbose)
+            add_sox_noise(audio_paths, noise_type, intensity, output_path, verbose, executor_args)
 
 def main():
     parser = argparse.ArgumentParser(description="Add some noise to audio files.")
@@ -181,13 +192,14 @@ def main():
     parser.add_argument("-y", "--ids", nargs="+", help="YouTube video IDs for custom noise")
     parser.add_argument("-i", "--intensity", type=float, default=1.0, help="Intensity of the noise (default: 1.0)")
     parser.add_argument("-v", "--verbose", action="store_true", help="Print verbose output", default=False)
+    add_executor_arguments(parser, default="thread")
     args = parser.parse_args()
 
     args.output_path = args.output_path.format(noise_type=args.noise_type, intensity=args.intensity)
 
     audio_paths = load_audio_files(args.paths)
         
-    add_noise(audio_paths, args.output_path, args.noise_type, args.intensity, args.ids, args.verbose)
+    add_noise(audio_paths, args.output_path, args.noise_type, args.intensity, args.ids, args.verbose, executor_options(args))
 
 if __name__ == "__main__":
     main()
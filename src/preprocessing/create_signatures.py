@@ -1,22 +1,33 @@
 import os
 import argparse
 import subprocess
-from multiprocessing import Pool, cpu_count
-from common.utils import load_audio_files, is_package_installed, timer
+import tempfile
+from common.utils import load_audio_files, is_package_installed, encode_signature, get_number_of_frequencies, signature_encoders, timer
+from common.landmarks import extract_landmarks, write_landmarks
+from common.executor import starmap, add_executor_arguments, executor_options
 
 def compile_get_max_freqs():
     if not os.path.exists("GetMaxFreqs/src/GetMaxFreqs.cpp"):
         print("GetMaxFreqs.cpp does not exist")
         return False
 
-    if subprocess.run(["g++", "-W", "-Wall", "-std=c++11", "-o", "GetMaxFreqs/bin/GetMaxFreqs", "GetMaxFreqs/src/GetMaxFreqs.cpp", "-lsndfile", "-lfftw3", "-lm"]).returncode != 0:
+    # Skip the build when the binary is up to date, streamed batches call this for every batch
+    if os.path.exists("GetMaxFreqs/bin/GetMaxFreqs") and os.path.getmtime("GetMaxFreqs/bin/GetMaxFreqs") >= os.path.getmtime("GetMaxFreqs/src/GetMaxFreqs.cpp"):
+        return True
+
+    fd, temp_binary = tempfile.mkstemp(prefix=".GetMaxFreqs-", dir="GetMaxFreqs/bin")
+    os.close(fd)
+    if subprocess.run(["g++", "-W", "-Wall", "-std=c++11", "-o", temp_binary, "GetMaxFreqs/src/GetMaxFreqs.cpp", "-lsndfile", "-lfftw3", "-lm"]).returncode != 0:
         print("Compilation failed")
+        os.remove(temp_binary)
         return False
 
-    if subprocess.run(["chmod", "+x", "GetMaxFreqs/bin/GetMaxFreqs"]).returncode != 0:
+    if subprocess.run(["chmod", "+x", temp_binary]).returncode != 0:
         print("Failed to add permissions to GetMaxFreqs")
+        os.remove(temp_binary)
         return False
 
+    os.replace(temp_binary, "GetMaxFreqs/bin/GetMaxFreqs")
     return True
 
 def check_dependencies():
@@ -27,24 +38,30 @@ def check_dependencies():
             return False
     return True
 
-def generate_signature(args):
-    path, output_path, signature_args = args
+def encode_signature_file(path, output_file, n_freqs, encoding, stride):
+    with open(path, "rb") as file:
+        data = file.read()
+
+    with open(output_file, "wb") as file:
+        file.write(encode_signature(data, n_freqs, encoding, stride))
+
+def generate_signature(path, output_path, signature_args, encoding, stride):
     output_file = os.path.join(output_path, os.path.basename(path).rsplit('.', 1)[0] + ".freqs")
-    signature_args = signature_args.split()
-    if subprocess.run(["GetMaxFreqs/bin/GetMaxFreqs", "-w", output_file] + signature_args + [path]).returncode != 0:
+    if subprocess.run(["GetMaxFreqs/bin/GetMaxFreqs", "-w", output_file] + signature_args.split() + [path]).returncode != 0:
         print(f"Failed to generate signature for {path}")
         return False
+    if encoding != "raw" or stride != 1:
+        encode_signature_file(output_file, output_file, get_number_of_frequencies(signature_args), encoding, stride)
     return True
 
-def create_gmf_signatures(paths, output_path, args, verbose=False):
+def create_gmf_signatures(paths, output_path, args, encoding="raw", stride=1, verbose=False, executor_args=None):
     os.makedirs(output_path, exist_ok=True)
 
     if not check_dependencies() or not compile_get_max_freqs():
         return
 
-    with Pool(cpu_count()) as pool:
-        tasks = [(path, output_path, args) for path in paths]
-        results = pool.map(generate_signature, tasks)
+    tasks = [(path, output_path, args, encoding, stride) for path in paths]
+    results = starmap(generate_signature, tasks, **(executor_args or {}))
 
     if verbose:
         for path, result in zip(paths, results):
@@ -53,11 +70,44 @@ def create_gmf_signatures(paths, output_path, args, verbose=False):
             else:
                 print(f"Failed to generate signature for {path}")
 
+def generate_landmarks(path, output_path, signature_args, fan_out, max_delta):
+    output_file = os.path.join(output_path, os.path.basename(path).rsplit('.', 1)[0] + ".landmarks")
+    fd, peaks_file = tempfile.mkstemp(suffix=".freqs")
+    os.close(fd)
+    try:
+        if subprocess.run(["GetMaxFreqs/bin/GetMaxFreqs", "-w", peaks_file] + signature_args.split() + [path]).returncode != 0:
+            print(f"Failed to generate landmarks for {path}")
+            return False
+        with open(peaks_file, "rb") as file:
+            peaks = file.read()
+        write_landmarks(output_file, extract_landmarks(peaks, get_number_of_frequencies(signature_args), fan_out, max_delta))
+        return True
+    finally:
+        os.remove(peaks_file)
+
+def create_landmark_signatures(paths, output_path, args, fan_out=5, max_delta=32, verbose=False, executor_args=None):
+    os.makedirs(output_path, exist_ok=True)
+
+    if not check_dependencies() or not compile_get_max_freqs():
+        return
+
+    tasks = [(path, output_path, args, fan_out, max_delta) for path in paths]
+    results = starmap(generate_landmarks, tasks, **(executor_args or {}))
+
+    if verbose:
+        for path, result in zip(paths, results):
+            if result:
+                print(f"Generated landmarks for {path}")
+            else:
+                print(f"Failed to generate landmarks for {path}")
+
 @timer
-def create_signatures(paths, output_path, signature_type, args, verbose=False):
+def create_signatures(paths, output_path, signature_type, args, encoding="raw", stride=1, fan_out=5, max_delta=32, verbose=False, executor_args=None):
     match signature_type:
         case "gmf":
-            create_gmf_signatures(paths, output_path, args, verbose)
+            create_gmf_signatures(paths, output_path, args, encoding, stride, verbose, executor_args)
+        case "landmark":
+            create_landmark_signatures(paths, output_path, args, fan_out, max_delta, verbose, executor_args)
         case _:
             print(f"Invalid signature type: {signature_type}")
             return
@@ -66,16 +116,21 @@ def main():
     parser = argparse.ArgumentParser(description="Generate audio signatures from audio files.")
     parser.add_argument("paths", nargs="+", type=str, help="Path to audio files or directories containing audio files")
     parser.add_argument("-o", "--output-path", type=str, default="data/signatures/{signature_type}", help="Output path for signatures (default: data/signatures/{signature_type})")
-    parser.add_argument("-n", "--signature-type", type=str, default="gmf", help="Type of signature to generate", choices=["gmf"])
+    parser.add_argument("-n", "--signature-type", type=str, default="gmf", help="Type of signature to generate", choices=["gmf", "landmark"])
     parser.add_argument("-z", "--signature-args", nargs='?', type=str, const="", default="", help="Arguments for the signature type")
+    parser.add_argument("-e", "--encoding", type=str, default="raw", help="Encoding of the signature frames (gmf only, default: raw)", choices=list(signature_encoders.keys()))
+    parser.add_argument("-s", "--stride", type=int, default=1, help="Keep only every stride-th frame of the signature (gmf only, default: 1)")
+    parser.add_argument("-f", "--fan-out", type=int, default=5, help="Number of target peaks paired with each anchor peak (landmark only, default: 5)")
+    parser.add_argument("-t", "--max-delta", type=int, default=32, help="Maximum frame distance between anchor and target peaks (landmark only, default: 32)")
     parser.add_argument("-v", "--verbose", action="store_true", help="Print verbose output", default=False)
+    add_executor_arguments(parser)
     args = parser.parse_args()
 
     args.output_path = args.output_path.format(signature_type=args.signature_type)
     
     audio_paths = load_audio_files(args.paths)
     
-    create_signatures(audio_paths, args.output_path, args.signature_type, args.signature_args, args.verbose)
+    create_signatures(audio_paths, args.output_path, args.signature_type, args.signature_args, args.encoding, args.stride, args.fan_out, args.max_delta, args.verbose, executor_options(args))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file